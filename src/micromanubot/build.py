@@ -1,24 +1,35 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import importlib.resources
+import json
 import os
 import pathlib
 import re
 import shlex
 import shutil
 import subprocess
+import threading
+import uuid
 from typing import TypeVar
 
 import bibtexparser
+import pylatexenc
 import pylatexenc.latexwalker
+import pylatexenc.macrospec
 import rich.progress
-from pylatexenc.latexwalker import LatexEnvironmentNode, LatexMacroNode
 
+import micromanubot
 import micromanubot.cite
 import micromanubot.config
 import micromanubot.figures
 import micromanubot.install
 
+# Auxiliary files written by LaTeX and BibTeX, and the log of a `umb` build
+LATEX_AUX_SUFFIXES = (".aux", ".bbl", ".bcf", ".toc", ".fls")
+BUILD_LOG = "umb-build.log"
+
 
 def is_umb_project(root_dir: pathlib.Path) -> bool:
     """Check if a directory is a valid micromanubot project."""
@@ -32,17 +43,62 @@ def is_umb_project(root_dir: pathlib.Path) -> bool:
 def setup_build_directory(root_dir: pathlib.Path) -> None:
     """Setup the `build` directory and `assets`/`images` subdirectories."""
     build_dir = root_dir.joinpath("build")
+    if build_dir.exists():
+        clear_directory(build_dir, root_dir.joinpath(".umb"))
+
     build_dir.mkdir(exist_ok=True)
-    for child in build_dir.iterdir():
-        if child.is_dir():
-            shutil.rmtree(child)
-        else:
-            child.unlink()
+    build_dir.joinpath("images").mkdir(exist_ok=True)
+    with os.scandir(root_dir.joinpath("assets")) as entries:
+        for entry in entries:
+            link_or_copy(entry.path, build_dir.joinpath(entry.name))
+
 
-    build_dir.joinpath("images").mkdir()
-    assets_path = root_dir.joinpath("assets")
-    for asset in assets_path.iterdir():
-        shutil.copy(asset, build_dir)
+def clear_directory(
+    directory: pathlib.Path, trash_dir: pathlib.Path
+) -> threading.Thread:
+    """Remove a directory without waiting for its contents to be deleted.
+
+    The directory is moved into `trash_dir` and deleted in a background
+    thread, which the interpreter waits for before exiting. The same thread
+    deletes any trash left behind by interrupted runs. If the directory cannot
+    be moved (e.g. files are in use on Windows), its contents are deleted in
+    place instead.
+
+    Returns the deletion thread.
+    """
+    # Unique, so an earlier build's trash may still be being deleted
+    trash = trash_dir.joinpath(f"trash-{uuid.uuid4().hex}")
+    try:
+        os.rename(directory, trash)
+    except OSError:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+
+    thread = threading.Thread(target=empty_trash, args=(trash_dir,))
+    thread.start()
+    return thread
+
+
+def empty_trash(trash_dir: pathlib.Path) -> None:
+    """Delete every directory moved into `trash_dir` by `clear_directory`."""
+    for path in trash_dir.glob("trash-*"):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def link_or_copy(source: str | os.PathLike, target: str | os.PathLike) -> None:
+    """Hard link a file, or copy it if linking is not possible.
+
+    Linking avoids copying the file contents, but fails across filesystems or
+    on filesystems that do not support hard links.
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy(source, target)
 
 
 def build_latex(root_dir: pathlib.Path) -> None:
@@ -54,6 +110,7 @@ def build_latex(root_dir: pathlib.Path) -> None:
     4. Gather citations and write to `.umb` and `build`.
     5. Gather figures and write to `build/images`.
     """
+    manifest = build_manifest(root_dir)
     build_dir = root_dir.joinpath("build")
     shutil.copy(root_dir.joinpath("content/imports.tex"), build_dir)
     main_files = find_manuscript_files(root_dir)
@@ -67,10 +124,15 @@ def build_latex(root_dir: pathlib.Path) -> None:
         manual_path=root_dir.joinpath("content").joinpath("images"),
     )
 
+    parse_cache_dir = root_dir.joinpath(".umb", "ast_cache")
+    sections = [ManuscriptSection.read_tex(file) for file in main_files]
+    find_section_references(sections, parse_cache_dir)
+    prune_reference_cache(sections, parse_cache_dir)
+
     built_main_files = list()
-    for file in main_files:
+    for file, section in zip(main_files, sections):
         output_path = build_dir.joinpath(file.name)
-        ManuscriptSection.read_tex(file).process(bib, fig).write(output_path)
+        section.process(bib, fig, parse_cache_dir).write(output_path)
         if file.name[0].isdigit():
             built_main_files.append(output_path)
 
@@ -80,22 +142,92 @@ def build_latex(root_dir: pathlib.Path) -> None:
     fig.reconcile_figures(build_dir)
 
     metadata = micromanubot.config.Metadata.read_toml(root_dir.joinpath("umb.toml"))
-    build_files = importlib.resources.files("micromanubot.template_data.build")
-    template_path = build_files.joinpath("main.tex")
-    with importlib.resources.as_file(template_path) as file:
-        (
-            MainTemplate.read_tex(file)
-            .process(metadata, built_main_files)
-            .write(root_dir.joinpath("build", "main.tex"))
-        )
+    (
+        MainTemplate(load_main_template())
+        .process(metadata, built_main_files)
+        .write(root_dir.joinpath("build", "main.tex"))
+    )
+
+    manifest["outputs"] = list_build_outputs(build_dir)
+    with open(root_dir.joinpath(".umb", "build_manifest.json"), "w") as f:
+        json.dump(manifest, f)
 
     return None
 
 
+@functools.cache
+def load_main_template() -> str:
+    """Read the packaged `main.tex` template."""
+    build_files = importlib.resources.files("micromanubot.template_data.build")
+    return build_files.joinpath("main.tex").read_text(encoding="utf-8")
+
+
+def build_manifest(root_dir: pathlib.Path) -> dict:
+    """Fingerprint all the inputs to `build_latex`.
+
+    Files are identified by their modification time and size, which is enough
+    to notice changes without reading every file.
+    """
+    paths = [root_dir.joinpath("umb.toml")]
+    paths.extend(root_dir.joinpath("content").rglob("*"))
+    paths.extend(root_dir.joinpath("assets").rglob("*"))
+
+    files = dict()
+    for path in sorted(paths):
+        if path.is_file():
+            stat = path.stat()
+            name = path.relative_to(root_dir).as_posix()
+            files[name] = [stat.st_mtime_ns, stat.st_size]
+
+    return {"version": micromanubot.__version__, "files": files}
+
+
+def list_build_outputs(build_dir: pathlib.Path) -> list[str]:
+    """List the files written to `build` by `build_latex`.
+
+    These include the processed sources, `references.bib`, the figures in
+    `images`, and the copied assets.
+    """
+    return sorted(
+        path.relative_to(build_dir).as_posix()
+        for path in build_dir.rglob("*")
+        if path.is_file()
+    )
+
+
+def is_build_current(root_dir: pathlib.Path) -> bool:
+    """Check whether `build` is up to date with the manuscript sources.
+
+    This is the case if no input has changed since the last `build_latex`, and
+    every file it wrote to `build` still exists.
+    """
+    try:
+        with open(root_dir.joinpath(".umb", "build_manifest.json")) as f:
+            stored = json.load(f)
+        outputs = stored.pop("outputs")
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return False
+
+    if stored != build_manifest(root_dir):
+        return False
+
+    build_dir = root_dir.joinpath("build")
+    return all(build_dir.joinpath(name).is_file() for name in outputs)
+
+
 def build_latex_pdf(root_dir: pathlib.Path) -> None:
-    """Compile the built LaTeX manuscript to a PDF."""
+    """Compile the built LaTeX manuscript to a PDF.
+
+    Compilation is skipped if the inputs in `build` are unchanged since the last
+    successful compilation, in which case the cached outputs are restored.
+    """
     build_dir = root_dir.joinpath("build")
+    cache_dir = root_dir.joinpath(".umb", "pdf_cache")
     pdflatex = micromanubot.install.find_pdflatex().as_posix()
+    digest = hash_latex_inputs(build_dir, latex_engine_version(pdflatex))
+    if restore_latex_outputs(cache_dir.joinpath(digest), build_dir):
+        return
+
     bibtex = micromanubot.install.find_bibtex().as_posix()
     commands = [
         f"{pdflatex} -interaction=nonstopmode main",
@@ -108,18 +240,120 @@ def build_latex_pdf(root_dir: pathlib.Path) -> None:
     # https://reproducible-builds.org/specs/source-date-epoch
     env = os.environ.copy()
     env["SOURCE_DATE_EPOCH"] = "0"
-    for command in rich.progress.track(commands, description="Compiling LaTeX"):
-        command_args = shlex.split(command)
-        result = subprocess.run(
-            command_args, cwd=build_dir, capture_output=True, env=env
-        )
-        if result.returncode != 0:
-            raise ValueError(
-                f"Error compiling LaTeX: {command}.",
-                result.returncode,
-                result.stdout,
-                result.stderr,
+    tracked = rich.progress.track(commands, description="Compiling LaTeX")
+    # Compiler output goes straight to a log file rather than into memory
+    log_path = build_dir.joinpath(BUILD_LOG)
+    with open(log_path, "wb") as log:
+        for i, command in enumerate(tracked):
+            # The final pass is only needed if LaTeX asks for it
+            if i == len(commands) - 1 and not latex_needs_rerun(build_dir):
+                continue
+
+            command_args = shlex.split(command)
+            log.flush()
+            start = log.tell()
+            result = subprocess.run(
+                command_args,
+                cwd=build_dir,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                env=env,
             )
+            if result.returncode != 0:
+                raise ValueError(
+                    f"Error compiling LaTeX: {command}. See {log_path}.",
+                    result.returncode,
+                    read_log_tail(log_path, start),
+                )
+
+    store_latex_outputs(build_dir, cache_dir.joinpath(digest))
+
+
+def read_log_tail(path: pathlib.Path, start: int, size: int = 8192) -> str:
+    """Read the end of a log file, from no earlier than `start`."""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        f.seek(max(start, end - size))
+        return f.read().decode(errors="replace")
+
+
+def is_latex_output(path: pathlib.Path, build_dir: pathlib.Path) -> bool:
+    """Check if a file in `build` is generated by compiling `main.tex`."""
+    if path.name == BUILD_LOG or path.suffix in LATEX_AUX_SUFFIXES:
+        return True
+    return path.parent == build_dir and path.stem == "main" and path.suffix != ".tex"
+
+
+def latex_engine_version(pdflatex: str) -> str:
+    """Identify the installed LaTeX engine by its path, mtime and size.
+
+    Upgrading the engine replaces the binary, so this is enough to notice an
+    upgrade without running it.
+    """
+    path = os.path.realpath(pdflatex)
+    stat = os.stat(path)
+    return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def hash_latex_inputs(build_dir: pathlib.Path, engine_version: str = "") -> str:
+    """Hash all the files in `build` that are inputs to the LaTeX compiler.
+
+    The version of the LaTeX engine is included, so that upgrading it
+    invalidates any cached outputs.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(engine_version.encode())
+    hasher.update(b"\0")
+    for path in sorted(build_dir.rglob("*")):
+        if not path.is_file() or is_latex_output(path, build_dir):
+            continue
+
+        hasher.update(path.relative_to(build_dir).as_posix().encode())
+        hasher.update(b"\0")
+        hasher.update(path.read_bytes())
+        hasher.update(b"\0")
+
+    return hasher.hexdigest()
+
+
+def latex_needs_rerun(build_dir: pathlib.Path) -> bool:
+    """Check whether the last LaTeX run asked to be run again.
+
+    LaTeX and packages log e.g. "Rerun to get cross-references right." or
+    "Table widths have changed. Rerun LaTeX." when the output is not final.
+    """
+    log_path = build_dir.joinpath("main.log")
+    if not log_path.exists():
+        return True
+
+    with open(log_path, "rb") as f:
+        return b"Rerun" in f.read()
+
+
+def restore_latex_outputs(cache_path: pathlib.Path, build_dir: pathlib.Path) -> bool:
+    """Copy cached LaTeX outputs into `build`, if they exist."""
+    if not cache_path.joinpath("main.pdf").exists():
+        return False
+
+    for cached_file in cache_path.iterdir():
+        shutil.copy(cached_file, build_dir)
+
+    return True
+
+
+def store_latex_outputs(build_dir: pathlib.Path, cache_path: pathlib.Path) -> None:
+    """Cache the PDF and auxiliary files from a successful compilation.
+
+    Only the most recent compilation is kept.
+    """
+    if cache_path.parent.exists():
+        shutil.rmtree(cache_path.parent)
+    cache_path.mkdir(parents=True)
+
+    for suffix in (".pdf", *LATEX_AUX_SUFFIXES):
+        output_path = build_dir.joinpath("main").with_suffix(suffix)
+        if output_path.exists():
+            shutil.copy(output_path, cache_path)
 
 
 def find_manuscript_files(root_dir: pathlib.Path) -> list[pathlib.Path]:
@@ -128,23 +362,91 @@ def find_manuscript_files(root_dir: pathlib.Path) -> list[pathlib.Path]:
     These include the main manuscript files (e.g. `1-introduction.tex`) and
     the abstract and supplement files, if they exist.
     """
-    main_files = sorted(root_dir.joinpath("content").glob("[0-9]*.tex"))
-    if not main_files:
+    content_dir = root_dir.joinpath("content")
+    main_names = list()
+    abstract = supplement = None
+    with os.scandir(content_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".tex") or not entry.is_file():
+                continue
+            if "0" <= entry.name[0] <= "9":
+                main_names.append(entry.name)
+            elif entry.name == "abstract.tex":
+                abstract = entry.name
+            elif entry.name == "supplement.tex":
+                supplement = entry.name
+
+    if not main_names:
         raise ValueError("No main files found in the content directory.")
 
-    abstract_path = root_dir.joinpath("content").joinpath("abstract.tex")
-    if abstract_path.exists():
-        main_files.insert(0, abstract_path)
+    names = [abstract, *sorted(main_names), supplement]
+    return [content_dir.joinpath(name) for name in names if name is not None]
+
+
+def content_digest(raw_content: str) -> str:
+    """Hash the content of a file for caching parse results.
+
+    The versions of micromanubot and pylatexenc are included, so that upgrading
+    either one invalidates any cached results.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    for part in (micromanubot.__version__, pylatexenc.__version__, raw_content):
+        hasher.update(part.encode())
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def replace_all(content: str, replacements: dict[str, str]) -> str:
+    """Replace all occurrences of the keys of `replacements` in a single pass.
 
-    supplement_path = root_dir.joinpath("content").joinpath("supplement.tex")
-    if supplement_path.exists():
-        main_files.append(supplement_path)
+    Where several keys match at the same position, the longest one wins.
+    """
+    if not replacements:
+        return content
+
+    keys = sorted(replacements, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(key) for key in keys))
+    return pattern.sub(lambda match: replacements[match.group()], content)
+
+
+@functools.cache
+def _latex_context() -> pylatexenc.macrospec.LatexContextDb:
+    return pylatexenc.latexwalker.get_default_latex_context_db()
 
-    return main_files
+
+def parse_latex_node(content: str) -> pylatexenc.latexwalker.LatexNode:
+    """Parse a snippet of LaTeX and return its first node."""
+    walker = pylatexenc.latexwalker.LatexWalker(content, latex_context=_latex_context())
+    nodelist, _, _ = walker.get_latex_nodes()
+    return nodelist[0]
 
 
 T = TypeVar("T", bound="ManuscriptFile")
 
+# Spans of LaTeX that contain citations and figures
+_CITE_RE = re.compile(r"\\cite(?![a-zA-Z])\*?\s*(?:\[[^\]]*\]\s*)*\{[^}]*\}")
+_FIGURE_RE = re.compile(r"\\begin\{figure\}.*?\\end\{figure\}", re.DOTALL)
+
+# Text that LaTeX does not expand: comments, verbatim environments and `\verb`.
+# These are matched in one pass so that whichever starts first wins.
+_IGNORED_RE = re.compile(
+    r"(?<!\\)%[^\n]*"
+    r"|\\begin\{(verbatim\*?|Verbatim|lstlisting|minted|comment)\}.*?\\end\{\1\}"
+    r"|\\verb\*?([^a-zA-Z*\s])[^\n]*?\2",
+    re.DOTALL,
+)
+
+# Macro and environment definitions, up to the start of their bodies
+_DEFINITION_RE = re.compile(
+    r"\\(?:(?:re)?newcommand|providecommand|DeclareRobustCommand)\*?"
+    r"\s*(?:\{\\[a-zA-Z@]+\}|\\[a-zA-Z@]+)\s*(?:\[[^\]]*\]\s*)*"
+    r"|\\[gex]?def\s*\\[a-zA-Z@]+[^{]*"
+    r"|\\(?P<env>(?:re)?newenvironment)\*?\s*\{[^}]*\}\s*(?:\[[^\]]*\]\s*)*"
+)
+
+# Template names (e.g. `@main`) appear on a line of their own in `main.tex`
+_TEMPLATE_RE = re.compile(r"^[^\S\n]*(@[a-z]+)[^\S\n]*$", re.MULTILINE)
+
 
 class ManuscriptFile:
     def __init__(self, raw_content: str) -> None:
@@ -153,18 +455,14 @@ class ManuscriptFile:
 
     @classmethod
     def read_tex(cls: type[T], path: pathlib.Path) -> T:
-        with open(path) as f:
-            raw_content = f.read()
-
-        return cls(raw_content)
+        return cls(pathlib.Path(path).read_text(encoding="utf-8"))
 
     def write(self, path: pathlib.Path) -> None:
         """Write the processed content to a file."""
         if self.fmt_content is None:
             raise ValueError("The content has not been processed yet.")
 
-        with open(path, "w") as f:
-            f.write(self.fmt_content)
+        pathlib.Path(path).write_text(self.fmt_content, encoding="utf-8")
 
 
 class ManuscriptSection(ManuscriptFile):
@@ -175,33 +473,163 @@ class ManuscriptSection(ManuscriptFile):
     the main LaTeX document via the `input` command after processing.
     """
 
+    def __init__(self, raw_content: str) -> None:
+        super().__init__(raw_content)
+        self.digest = content_digest(raw_content)
+        self.references: tuple[set[str], set[str]] | None = None
+
     def process(
         self,
         bib: micromanubot.cite.Bibliography,
         fig: micromanubot.figures.ManuscriptFigures,
+        cache_dir: pathlib.Path | None = None,
     ) -> ManuscriptSection:
-        walker = pylatexenc.latexwalker.LatexWalker(self.raw_content)
-        nodelist, _, _ = walker.get_latex_nodes()
-
-        for node in nodelist:
-            if isinstance(node, LatexMacroNode) and node.macroname == "cite":
-                bib.parse_node(node)
-            elif (
-                isinstance(node, LatexEnvironmentNode)
-                and node.environmentname == "figure"
-            ):
-                fig.parse_node(node)
-
-        self.fmt_content = self.raw_content
-        keys_to_replace = [key for key in bib.unique_keys if "@" in key]
-        for key in keys_to_replace:
-            self.fmt_content = self.fmt_content.replace(key, key.lstrip("@"))
-
-        for ref, alias in fig.reference_to_alias.items():
-            self.fmt_content = self.fmt_content.replace(ref, alias)
+        cite_keys, figure_refs = self.find_references(cache_dir)
+        bib.add_keys(cite_keys)
+        fig.add_references(figure_refs)
 
+        replacements = {key: key[1:] for key in cite_keys if key.startswith("@")}
+        replacements.update({ref: fig.reference_to_alias[ref] for ref in figure_refs})
+        self.fmt_content = replace_all(self.raw_content, replacements)
         return self
 
+    def find_references(
+        self, cache_dir: pathlib.Path | None = None
+    ) -> tuple[set[str], set[str]]:
+        """Find the citation keys and figure references in the section.
+
+        Parsing LaTeX is slow, so results are cached in `cache_dir` (if given),
+        keyed by the digest of the content. Unchanged files are not re-parsed.
+        """
+        if self.references is None:
+            find_section_references([self], cache_dir)
+
+        assert self.references is not None, "References should be set"
+        return self.references
+
+    def load_references(
+        self, cache_dir: pathlib.Path
+    ) -> tuple[set[str], set[str]] | None:
+        """Load the references of the section from the cache, if present."""
+        cache_path = cache_dir.joinpath(f"{self.digest}.json")
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            return set(cached["cite_keys"]), set(cached["figure_refs"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set_references(
+        self,
+        references: tuple[set[str], set[str]],
+        cache_dir: pathlib.Path | None = None,
+    ) -> None:
+        """Set the parsed references of the section and cache them."""
+        self.references = references
+        if cache_dir is None:
+            return
+
+        cite_keys, figure_refs = references
+        cache_dir.mkdir(exist_ok=True)
+        with open(cache_dir.joinpath(f"{self.digest}.json"), "w") as f:
+            cached = {
+                "cite_keys": sorted(cite_keys),
+                "figure_refs": sorted(figure_refs),
+            }
+            json.dump(cached, f)
+
+
+def find_section_references(
+    sections: list[ManuscriptSection], cache_dir: pathlib.Path | None = None
+) -> None:
+    """Find the references in all sections, parsing only uncached ones.
+
+    Sections are parsed serially: only short spans are parsed, so the cost of
+    starting worker processes would outweigh any gain.
+    """
+    to_parse = list()
+    for section in sections:
+        if section.references is None and cache_dir is not None:
+            section.references = section.load_references(cache_dir)
+        if section.references is None:
+            to_parse.append(section)
+
+    for section in to_parse:
+        section.set_references(parse_references(section.raw_content), cache_dir)
+
+
+def prune_reference_cache(
+    sections: list[ManuscriptSection], cache_dir: pathlib.Path
+) -> None:
+    """Delete cached references of sections that no longer exist.
+
+    Only the results for the current content of each section are kept.
+    """
+    digests = {section.digest for section in sections}
+    for path in cache_dir.glob("*.json"):
+        if path.stem not in digests:
+            path.unlink(missing_ok=True)
+
+
+def parse_references(content: str) -> tuple[set[str], set[str]]:
+    """Parse the citation keys and figure references in a section.
+
+    Rather than parsing the whole file, regular expressions find the `\\cite`
+    commands and `figure` environments, and only those (short) spans are
+    parsed as LaTeX. Comments, verbatim text and macro definitions are removed
+    first, as their contents are not citations.
+    """
+    content = strip_definitions(_IGNORED_RE.sub("", content))
+
+    cite_keys: set[str] = set()
+    for match in _CITE_RE.finditer(content):
+        node = parse_latex_node(match.group())
+        cite_keys.update(micromanubot.cite.extract_keys(node))
+
+    figure_refs: set[str] = set()
+    for match in _FIGURE_RE.finditer(content):
+        node = parse_latex_node(match.group())
+        figure_refs.update(micromanubot.figures.extract_keys(node))
+
+    return cite_keys, figure_refs
+
+
+def strip_definitions(content: str) -> str:
+    """Remove macro and environment definitions (e.g. `\\newcommand`)."""
+    parts = list()
+    pos = 0
+    while (match := _DEFINITION_RE.search(content, pos)) is not None:
+        parts.append(content[pos : match.start()])
+        pos = match.end()
+        # Environments have separate begin and end code
+        for _ in range(2 if match.group("env") else 1):
+            pos = _skip_group(content, pos)
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def _skip_group(content: str, pos: int) -> int:
+    """Return the position after the braced group starting at `pos`, if any."""
+    while pos < len(content) and content[pos].isspace():
+        pos += 1
+    if pos == len(content) or content[pos] != "{":
+        return pos
+
+    depth = 0
+    while pos < len(content):
+        char = content[pos]
+        if char == "\\":
+            pos += 1
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+
+    return pos
+
 
 class MainTemplate(ManuscriptFile):
     """A class to represent the main LaTeX file (a template).
@@ -215,47 +643,37 @@ class MainTemplate(ManuscriptFile):
     https://github.com/pappasam/latexbuild.
     """
 
-    def __init__(self, raw_content: str) -> None:
-        self.raw_content = raw_content
-        self.fmt_content: str | None = None
-        self.templates: list[str] = self._parse_templates(raw_content)
+    TEMPLATES = ["@metadata", "@abstract", "@main", "@supplement"]
+
+    @functools.cached_property
+    def templates(self) -> list[str]:
+        return self._parse_templates(self.raw_content)
 
     @staticmethod
     def _parse_templates(content: str) -> list[str]:
-        templates = []
-        lines = content.split("\n")
-        for line in lines:
-            match = re.match(r"^@[a-z]+$", line.strip())
-            if match:
-                templates.append(match.group())
-
-        return templates
+        return _TEMPLATE_RE.findall(content)
 
     @staticmethod
     def format_metadata(metadata: micromanubot.config.Metadata) -> str:
-        output = f"\\title{{{metadata.manuscript.title}}}\n\n"
-        output += f"\\date{{{metadata.manuscript.date}}}\n\n"
-        output += (
-            r"\renewcommand\Authfont{\bfseries}"
-            + "\n"
-            + r"\setlength{\affilsep}{0em}"
-            + "\n"
-            + r"\newbox{\orcid}\sbox{\orcid}{\includegraphics[scale=0.06]"
-            + r"{orcid.pdf}}"
-            + "\n\n"
-        )
+        parts = [
+            f"\\title{{{metadata.manuscript.title}}}\n\n",
+            f"\\date{{{metadata.manuscript.date}}}\n\n",
+            r"\renewcommand\Authfont{\bfseries}" + "\n",
+            r"\setlength{\affilsep}{0em}" + "\n",
+            r"\newbox{\orcid}\sbox{\orcid}{\includegraphics[scale=0.06]{orcid.pdf}}",
+            "\n\n",
+        ]
 
         affil_to_idx = MainTemplate.gather_affiliations(metadata.authors)
         for author in metadata.authors:
-            author_string = MainTemplate.format_author(author, affil_to_idx)
-            output += author_string + "\n"
+            parts.append(MainTemplate.format_author(author, affil_to_idx) + "\n")
 
-        output += "\n"
+        parts.append("\n")
 
         for affil, i in affil_to_idx.items():
-            output += f"\\affil[{i}]{{{affil}}}\n"
+            parts.append(f"\\affil[{i}]{{{affil}}}\n")
 
-        return output
+        return "".join(parts)
 
     @staticmethod
     def gather_affiliations(
@@ -278,62 +696,53 @@ class MainTemplate(ManuscriptFile):
     def format_author(
         author: micromanubot.config.Author, affil_to_idx: dict[str, int]
     ) -> str:
-        author_string = "\\author"
+        parts = ["\\author"]
         if author.affiliations is not None:
-            affil_idx = [str(affil_to_idx[a]) for a in author.affiliations]
-            affil_idx = ",".join(affil_idx)
-            author_string += f"[{affil_idx}]"
-        author_string += r"{"
+            affil_idx = ",".join(str(affil_to_idx[a]) for a in author.affiliations)
+            parts.append(f"[{affil_idx}]")
+        parts.append(r"{")
         if author.orcid is not None:
-            author_string += f"{{\\href{{https://orcid.org/{author.orcid}}}"
-            author_string += r"{\usebox{\orcid}\hspace{1mm}}"
-        name = author.name.replace(" ", "~")
-        author_string += name
+            parts.append(f"{{\\href{{https://orcid.org/{author.orcid}}}")
+            parts.append(r"{\usebox{\orcid}\hspace{1mm}}")
+        parts.append(author.name.replace(" ", "~"))
         if author.corresponding:
             if author.email is None:
-                author_string += r"\thanks{\texttt{Corresponding author}}"
+                parts.append(r"\thanks{\texttt{Corresponding author}}")
             else:
-                author_string += (
+                parts.append(
                     r"\thanks{\texttt{Correspondence may be addressed to "
                     + author.email
                     + r"}}"
                 )
-        author_string += r"}"
+        parts.append(r"}")
         if author.orcid is not None:
-            author_string += r"}"
-        return author_string
+            parts.append(r"}")
+        return "".join(parts)
 
     def process(
         self,
         metadata: micromanubot.config.Metadata,
         main_files: list[pathlib.Path],
     ) -> MainTemplate:
-        if self.templates != ["@metadata", "@abstract", "@main", "@supplement"]:
+        if self.templates != self.TEMPLATES:
             raise ValueError(
                 f"Unexpected templates in the main.tex file: {self.templates}."
             )
 
+        main_content = "".join(r"\input{" + file.name + "}\n" for file in main_files)
+        supplement_file = pathlib.Path("content/supplement.tex")
+        if supplement_file.exists():
+            supp_text = (
+                r"\section*{Supplementary Materials}" + "\n" + r"\input{supplement.tex}"
+            )
+        else:
+            supp_text = ""
+
         content = self.raw_content
-        if "@metadata" in self.templates:
-            content = content.replace("@metadata", self.format_metadata(metadata), 1)
-        if "@abstract" in self.templates:
-            content = content.replace("@abstract", r"\input{abstract.tex}", 1)
-        if "@main" in self.templates:
-            main_content = ""
-            for file in main_files:
-                main_content += r"\input{" + file.name + "}\n"
-            content = content.replace("@main", main_content, 1)
-        if "@supplement" in self.templates:
-            supplement_file = pathlib.Path("content/supplement.tex")
-            if supplement_file.exists():
-                supp_text = (
-                    r"\section*{Supplementary Materials}"
-                    + "\n"
-                    + r"\input{supplement.tex}"
-                )
-                content = content.replace("@supplement", supp_text, 1)
-            else:
-                content = content.replace("@supplement", "", 1)
+        content = content.replace("@metadata", self.format_metadata(metadata), 1)
+        content = content.replace("@abstract", r"\input{abstract.tex}", 1)
+        content = content.replace("@main", main_content, 1)
+        content = content.replace("@supplement", supp_text, 1)
 
         self.fmt_content = content
         return self
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import functools
+import json
 import logging
 import os
+import pathlib
 import sys
+from typing import Iterable
 
 import bibtexparser
-import pyrate_limiter
 import requests
-from bibtexparser.model import Block
+from bibtexparser.model import Entry, Field
 from pylatexenc.latexwalker import LatexMacroNode
 
 import micromanubot
+import micromanubot.fetch
 
 logger = logging.getLogger(__name__)
 
@@ -21,19 +25,28 @@ class Bibliography:
     ) -> None:
         self.cache_path = cache_path
         self.manual_path = manual_path
-        self.cache = bibtexparser.parse_file(str(cache_path))
-        self.manual = bibtexparser.parse_file(str(manual_path))
-        n_citations = len(self.cache.entries) + len(self.manual.entries)
-        logger.info(f"Loaded {n_citations} cached citation(s)")
         self.unique_keys: set[str] = set()
 
-    def parse_node(self, node: LatexMacroNode) -> None:
-        """Parse a LaTeX node and extract citation keys."""
-        if node.macroname != "cite":
-            raise ValueError("Node is not a citation node")
+    @functools.cached_property
+    def cache(self) -> bibtexparser.Library:
+        library = load_library(self.cache_path, self._parsed_path(self.cache_path))
+        logger.info(f"Loaded {len(library.entries)} cached citation(s)")
+        return library
 
-        citation_keys = extract_keys(node)
-        self.unique_keys.update(citation_keys)
+    @functools.cached_property
+    def manual(self) -> bibtexparser.Library:
+        library = load_library(self.manual_path, self._parsed_path(self.manual_path))
+        logger.info(f"Loaded {len(library.entries)} manual citation(s)")
+        return library
+
+    def _parsed_path(self, path: str | os.PathLike) -> pathlib.Path:
+        """Parsed BibTeX files are cached as JSON next to the citations cache."""
+        cache_dir = pathlib.Path(self.cache_path).parent
+        return cache_dir.joinpath(pathlib.Path(path).name + ".json")
+
+    def add_keys(self, keys: Iterable[str]) -> None:
+        """Add citation keys found in the manuscript."""
+        self.unique_keys.update(keys)
 
     def reconcile_citations(self) -> bibtexparser.Library:
         """Reconcile the citations in the manuscript with the cache and manual
@@ -41,41 +54,90 @@ class Bibliography:
         the manuscript.
         """
         cache_dict = self.cache.entries_dict
-        cache_keys = set(cache_dict.keys())
         manual_dict = self.manual.entries_dict
-        manual_keys = set(manual_dict.keys())
 
         logger.info(f"Found {len(self.unique_keys)} citation(s) in manuscript")
-        output = bibtexparser.Library()
+        entries: dict[str, Entry] = dict()
         references_to_pull = list()
         missing_keys = list()
-        for key in sorted(self.unique_keys):
-            if "@" in key:
-                stripped = key.lstrip("@").strip()
-                if stripped in cache_keys:
-                    output.add(cache_dict[stripped])
-                elif stripped in manual_keys:
-                    output.add(manual_dict[stripped])
-                else:
+        for key in self.unique_keys:
+            if key.startswith("@"):
+                stripped = key[1:].strip()
+                entry = cache_dict.get(stripped)
+                if entry is None:
+                    entry = manual_dict.get(stripped)
+                if entry is None:
                     references_to_pull.append(stripped)
-            elif key in manual_keys:
-                # Manual entries take precedence
-                output.add(manual_dict[key])
-            elif key in cache_keys:
-                output.add(cache_dict[key])
+                    continue
             else:
-                missing_keys.append(key)
+                # Manual entries take precedence
+                entry = manual_dict.get(key)
+                if entry is None:
+                    entry = cache_dict.get(key)
+                if entry is None:
+                    missing_keys.append(key)
+                    continue
+
+            entries[entry.key] = entry
 
         if missing_keys:
-            raise ValueError(f"Missing keys: {missing_keys}")
+            raise ValueError(f"Missing keys: {sorted(missing_keys)}")
 
         if references_to_pull:
-            new_entries = pull_doi_references(references_to_pull)
-            output.add(new_entries)
+            new_entries = pull_doi_references(sorted(references_to_pull))
+            entries.update((entry.key, entry) for entry in new_entries)
             self.cache.add(new_entries)
-            bibtexparser.write_file(str(self.cache_path), self.cache)
+            write_library(self.cache_path, self.cache)
+
+        # Sort by key so the output does not depend on where entries came from
+        return bibtexparser.Library([entries[key] for key in sorted(entries)])
 
-        return output
+
+def load_library(
+    path: str | os.PathLike, parsed_path: str | os.PathLike
+) -> bibtexparser.Library:
+    """Parse a BibTeX file, re-using a cached copy if the file is unchanged.
+
+    Parsing large BibTeX files is slow, so the entries of the parsed library are
+    stored as JSON in `parsed_path`, along with the size and modification time
+    of the file. Only entries are kept, which is all a `Bibliography` uses.
+    """
+    stat = os.stat(path)
+    signature = [bibtexparser.__version__, stat.st_mtime_ns, stat.st_size]
+    try:
+        with open(parsed_path) as f:
+            cached = json.load(f)
+        if cached["signature"] == signature:
+            return bibtexparser.Library(
+                [
+                    Entry(entry_type, key, [Field(*field) for field in fields])
+                    for entry_type, key, fields in cached["entries"]
+                ]
+            )
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, outdated, or corrupt caches are simply rebuilt
+        pass
+
+    library = bibtexparser.parse_file(str(path))
+    entries = [
+        [entry.entry_type, entry.key, [[f.key, f.value] for f in entry.fields]]
+        for entry in library.entries
+    ]
+    with open(parsed_path, "w") as f:
+        json.dump({"signature": signature, "entries": entries}, f)
+
+    return library
+
+
+def write_library(path: str | os.PathLike, library: bibtexparser.Library) -> None:
+    """Write a BibTeX library atomically.
+
+    The library is written to a temporary file which then replaces `path`, so
+    an interrupted write cannot leave a truncated cache behind.
+    """
+    tmp_path = pathlib.Path(path).with_name(pathlib.Path(path).name + ".tmp")
+    bibtexparser.write_file(str(tmp_path), library)
+    os.replace(tmp_path, path)
 
 
 def extract_keys(node: LatexMacroNode) -> set[str]:
@@ -115,39 +177,33 @@ def extract_keys(node: LatexMacroNode) -> set[str]:
     return set(citation_keys)
 
 
-def pull_doi_references(keys: list[str], n_per_second: int = 50) -> list[Block]:
+def pull_doi_references(keys: list[str], n_per_second: int = 50) -> list[Entry]:
     """Fetch BibTeX references for a list of DOI keys.
 
-    Ensure that no more than `n_per_second` requests are made."""
+    See `micromanubot.fetch.fetch_concurrently` for how requests are made."""
     logger.info(f"Fetching {len(keys)} reference(s)")
-    rate = pyrate_limiter.Rate(n_per_second, pyrate_limiter.Duration.SECOND)
-    limiter = pyrate_limiter.Limiter(rate, max_delay=1000)
-
-    results = list()
-    for key in keys:
-        try:
-            limiter.try_acquire(key)
-        except pyrate_limiter.LimiterDelayException as e:
-            raise ValueError("Rate limit exceeded") from e
+    return micromanubot.fetch.fetch_concurrently(keys, pull_doi_reference, n_per_second)
 
-        try:
-            result = fetch_doi_reference(key)
-        except Exception as e:
-            raise ValueError(f"Failed to fetch reference for {key}") from e
 
-        entry = bibtexparser.parse_string(result).entries[0]
-        entry.key = key
-        results.append(entry)
+def pull_doi_reference(key: str, session: requests.Session | None = None) -> Entry:
+    """Fetch and parse the BibTeX reference for a DOI key."""
+    try:
+        result = fetch_doi_reference(key, session)
+    except Exception as e:
+        raise ValueError(f"Failed to fetch reference for {key}") from e
 
-    return results
+    entry = bibtexparser.parse_string(result).entries[0]
+    entry.key = key
+    return entry
 
 
-def fetch_doi_reference(key: str) -> str:
+def fetch_doi_reference(key: str, session: requests.Session | None = None) -> str:
     """Fetch a BibTeX reference for a DOI using the doi.org API."""
     headers = {
         "Accept": "application/x-bibtex",
         "User-Agent": f"umb/{micromanubot.__version__}; Python/{sys.version}",
     }
-    response = requests.get(f"https://doi.org/{key}", headers=headers)
+    get = requests.get if session is None else session.get
+    response = get(f"https://doi.org/{key}", headers=headers)
     response.raise_for_status()
     return response.text
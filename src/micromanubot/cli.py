@@ -7,9 +7,6 @@ from rich.highlighter import NullHighlighter
 from rich.logging import RichHandler
 
 import micromanubot
-import micromanubot.build
-import micromanubot.install
-import micromanubot.new
 
 
 def main():
@@ -116,6 +113,11 @@ def add_install_command(subparsers: argparse._SubParsersAction) -> None:
         help="Force installation",
         action="store_true",
     )
+    install_parser.add_argument(
+        "--update-tlmgr",
+        help="Update tlmgr before installing packages",
+        action="store_true",
+    )
     add_verbosity_arg(install_parser)
 
 
@@ -135,7 +137,13 @@ def add_uninstall_command(subparsers: argparse._SubParsersAction) -> None:
     add_verbosity_arg(uninstall_parser)
 
 
+# Subcommand modules are imported by their handlers, since they are slow to
+# import and `umb --help`/`umb --version` need none of them
+
+
 def handle_new(args: argparse.Namespace) -> None:
+    import micromanubot.new
+
     if args.PATH.exists():
         raise ValueError(f"Path `{args.PATH}` already exists")
     args.PATH.mkdir()
@@ -145,11 +153,17 @@ def handle_new(args: argparse.Namespace) -> None:
 
 
 def handle_build(args: argparse.Namespace, cwd: pathlib.Path) -> None:
+    import micromanubot.build
+    import micromanubot.install
+
     if not micromanubot.build.is_umb_project(cwd):
         raise ValueError("Not an umb project")
     print("   [bold green]Building[/] manuscript")
-    micromanubot.build.setup_build_directory(cwd)
-    micromanubot.build.build_latex(cwd)
+    if micromanubot.build.is_build_current(cwd):
+        print("      [bold green]Fresh[/] LaTeX sources are up to date")
+    else:
+        micromanubot.build.setup_build_directory(cwd)
+        micromanubot.build.build_latex(cwd)
     if args.type in {"all", "pdf"}:
         micromanubot.install.check_pdflatex_bibtex_installed()
         micromanubot.build.build_latex_pdf(cwd)
@@ -157,6 +171,8 @@ def handle_build(args: argparse.Namespace, cwd: pathlib.Path) -> None:
 
 
 def handle_install(args: argparse.Namespace) -> None:
+    import micromanubot.install
+
     is_installed = micromanubot.install.is_tinytex_installed()
     if is_installed and not args.force:
         print("TinyTeX already installed (use --force to reinstall)")
@@ -166,11 +182,13 @@ def handle_install(args: argparse.Namespace) -> None:
         micromanubot.install.uninstall_tinytex(args.root)
 
     print(" [bold green]Installing[/] LaTeX compiler and packages")
-    micromanubot.install.install_tinytex(args.root)
+    micromanubot.install.install_tinytex(args.root, update_self=args.update_tlmgr)
     print("   [bold green]Finished[/] installing TinyTeX and packages")
 
 
 def handle_uninstall(args: argparse.Namespace) -> None:
+    import micromanubot.install
+
     if not micromanubot.install.is_tinytex_installed():
         print("TinyTeX is not installed")
         return
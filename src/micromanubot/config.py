@@ -4,12 +4,21 @@ import datetime
 import getpass
 import locale
 import os
+import sys
+from typing import TYPE_CHECKING
 
-import tomlkit
 from pydantic import BaseModel, Field
 
 import micromanubot
 
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    tomllib = None
+
+if TYPE_CHECKING:
+    import tomlkit
+
 
 class ManubotConfig(BaseModel):
     version: str = Field(default=micromanubot.__version__)
@@ -24,7 +33,7 @@ class Manuscript(BaseModel):
     @classmethod
     def make_no_custom(cls) -> Manuscript:
         """Create a default manuscript object without customizing."""
-        return cls(
+        return cls.model_construct(
             title="Manuscript Title",
             keywords=["umb", "micromanubot"],
             date=datetime.date(2024, 1, 1),
@@ -44,7 +53,7 @@ class Author(BaseModel):
     @classmethod
     def make_no_custom(cls) -> Author:
         """Create a default author object without customizing."""
-        return cls(
+        return cls.model_construct(
             name="Author Name",
             initials="AN",
             orcid="0000-0000-0000-0000",
@@ -64,9 +73,13 @@ class Metadata(BaseModel):
 
     @classmethod
     def make_no_custom(cls) -> Metadata:
-        """Create a default manuscript metadata object without customizing."""
-        return cls(
-            umb=ManubotConfig(),
+        """Create a default manuscript metadata object without customizing.
+
+        These values are constant and known to be valid, so validation is
+        skipped.
+        """
+        return cls.model_construct(
+            umb=ManubotConfig.model_construct(),
             manuscript=Manuscript.make_no_custom(),
             authors=[Author.make_no_custom()],
         )
@@ -88,9 +101,19 @@ class Metadata(BaseModel):
 
     @classmethod
     def read_toml(cls, path: str | os.PathLike) -> Metadata:
-        """Read manuscript metadata from a TOML file."""
-        with open(path, "r") as file:
-            doc = tomlkit.loads(file.read())
+        """Read manuscript metadata from a TOML file.
+
+        Formatting doesn't need to be preserved when reading, so the much
+        faster standard library parser is used where available.
+        """
+        if tomllib is None:
+            import tomlkit
+
+            with open(path, "r") as file:
+                doc = tomlkit.loads(file.read())
+        else:
+            with open(path, "rb") as file:
+                doc = tomllib.load(file)
 
         return cls.model_validate(doc)
 
@@ -100,6 +123,8 @@ class Metadata(BaseModel):
         This verbose implementation is used to give flexibility for future
         additions like comments, etc.
         """
+        import tomlkit
+
         doc = tomlkit.document()
 
         umb = tomlkit.table()
@@ -123,6 +148,8 @@ class Metadata(BaseModel):
 
     def write_toml(self, path: str | os.PathLike) -> None:
         """Write the metadata to a TOML file."""
+        import tomlkit
+
         toml_doc = self._build_toml()
         with open(path, "w") as file:
             tomlkit.dump(toml_doc, file)
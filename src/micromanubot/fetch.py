@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import concurrent.futures
+from typing import Callable, Sequence, TypeVar
+
+import pyrate_limiter
+import requests
+import requests.adapters
+
+# Maximum number of concurrent connections used to fetch references and figures
+MAX_CONNECTIONS = 16
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def fetch_concurrently(
+    items: Sequence[T],
+    fetch: Callable[[T, requests.Session], R],
+    n_per_second: int = 50,
+    max_retries: requests.adapters.Retry | int = 0,
+) -> list[R]:
+    """Call `fetch` on each item, passing a shared session, and return results.
+
+    Items are fetched concurrently over a shared, pooled session. Ensure that no
+    more than `n_per_second` requests are made.
+    """
+    rate = pyrate_limiter.Rate(n_per_second, pyrate_limiter.Duration.SECOND)
+    limiter = pyrate_limiter.Limiter(rate, max_delay=1000)
+
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=MAX_CONNECTIONS,
+        pool_maxsize=MAX_CONNECTIONS,
+        max_retries=max_retries,
+    )
+    with (
+        requests.Session() as session,
+        concurrent.futures.ThreadPoolExecutor(MAX_CONNECTIONS) as executor,
+    ):
+        session.mount("https://", adapter)
+        futures = list()
+        for item in items:
+            try:
+                limiter.try_acquire("fetch")
+            except pyrate_limiter.LimiterDelayException as e:
+                raise ValueError("Rate limit exceeded") from e
+
+            futures.append(executor.submit(fetch, item, session))
+
+        return [future.result() for future in futures]
@@ -1,20 +1,33 @@
 from __future__ import annotations
 
+import concurrent.futures
+import dataclasses
+import functools
 import logging
 import pathlib
 import shutil
 import urllib.parse
+from typing import Iterable
 
-import pyrate_limiter
 import requests
+import requests.adapters
 import validators
 from pydantic import AnyUrl, BaseModel, Field
 from pylatexenc.latexwalker import LatexEnvironmentNode, LatexMacroNode
 
+import micromanubot.fetch
+
 logger = logging.getLogger(__name__)
 
 
-class FigureSpec(BaseModel):
+@dataclasses.dataclass(slots=True, frozen=True)
+class FigureSpec:
+    """A figure referenced in the manuscript.
+
+    This is a plain dataclass, so it is cheap to create. Validation only
+    happens when `FiguresCache` reads it from JSON.
+    """
+
     old_alias: str
     new_alias: str
     url: AnyUrl | None = None
@@ -34,10 +47,18 @@ class FiguresCache(BaseModel):
             str(figure.old_alias): figure for figure in self.figures
         }
 
-    def __add__(self, other: FiguresCache) -> FiguresCache:
-        all_figures = set(self.figures + other.figures)
-        new_figures = sorted(all_figures, key=lambda x: x.old_alias)
-        return FiguresCache(figures=new_figures)
+    @classmethod
+    def from_figures(cls, figures: Iterable[FigureSpec]) -> FiguresCache:
+        """Build a de-duplicated, sorted cache from trusted figures.
+
+        Validation is skipped, since the figures are already `FigureSpec`s.
+        """
+        new_figures = sorted(set(figures), key=lambda x: x.old_alias)
+        result = cls.model_construct(figures=new_figures)
+        result.alias_to_figure = {
+            str(figure.old_alias): figure for figure in new_figures
+        }
+        return result
 
     def write_json(self, path: pathlib.Path) -> None:
         content = self.model_dump_json(indent=2)
@@ -59,17 +80,17 @@ class ManuscriptFigures:
         with open(self.cache_json_path, "r") as f:
             cache_content = f.read()
         cache = FiguresCache.model_validate_json(cache_content)
-        manual_cache = self._find_content_images(self.manual_path)
-        self.cache: FiguresCache = cache + manual_cache
+        manual_figures = self._find_content_images(self.manual_path)
+        self.cache = FiguresCache.from_figures(cache.figures + manual_figures)
         logger.info(f"Loaded {len(self.cache.figures)} cached figure(s)")
 
         self.reference_to_alias: dict[str, str] = dict()
 
     @staticmethod
-    def _find_content_images(directory: pathlib.Path) -> FiguresCache:
+    def _find_content_images(directory: pathlib.Path) -> list[FigureSpec]:
         """
-        Find all local images and return a dictionary of their paths and
-        aliases. `directory` should point to `content/images`.
+        Find all local images and return a list of their paths and aliases.
+        `directory` should point to `content/images`.
         """
         images = list()
         for image_path in directory.iterdir():
@@ -81,19 +102,15 @@ class ManuscriptFigures:
                 local_path=image_path,
             )
             images.append(fig)
-        return FiguresCache.model_validate({"figures": images})
+        return images
 
-    def parse_node(self, node: LatexEnvironmentNode) -> None:
-        """Parse a LaTeX node and extract the image path/url."""
-        if node.environmentname != "figure":
-            raise ValueError("Node is not a figure node")
-
-        keys = extract_keys(node)
+    def add_references(self, keys: Iterable[str]) -> None:
+        """Add image paths/urls referenced in the manuscript."""
         self.reference_to_alias.update({key: self._make_alias(key) for key in keys})
 
     @staticmethod
     def _get_fig_name(key: str) -> str:
-        if validators.url(key):
+        if _is_url(key):
             path = urllib.parse.urlparse(key).path
             filename = pathlib.Path(path).name
         elif pathlib.Path(key).is_file():
@@ -119,41 +136,61 @@ class ManuscriptFigures:
         populate `self.reference_to_alias`.
         """
         logger.info(f"Found {len(self.reference_to_alias)} figure(s) in manuscript")
-        to_download: list[FigureSpec] = list()
-        missing: list[str] = list()
-        for ref, alias in self.reference_to_alias.items():
-            if ref in self.cache.alias_to_figure:
-                fig = self.cache.alias_to_figure[ref]
-                if fig.local_path is None:
-                    missing.append(ref)
-                else:
-                    shutil.copy(fig.local_path, build_dir / alias)
-            elif validators.url(ref):
-                fig_info = {
-                    "old_alias": ref,
-                    "new_alias": alias,
-                    "local_path": self.cache_path.joinpath(self._get_fig_name(ref)),
-                    "url": ref,
-                }
-                fig = FigureSpec.model_validate(fig_info)
-                to_download.append(fig)
-            else:
-                missing.append(ref)
+        cached = self.cache.alias_to_figure
+        to_copy = {
+            alias: cached[ref]
+            for ref, alias in self.reference_to_alias.items()
+            if ref in cached
+        }
+        uncached = self.reference_to_alias.keys() - cached.keys()
+        url_refs = {ref for ref in uncached if _is_url(ref)}
+        missing = uncached - url_refs
+        missing.update(
+            fig.old_alias for fig in to_copy.values() if fig.local_path is None
+        )
+        to_download = [
+            FigureSpec(
+                old_alias=ref,
+                new_alias=self.reference_to_alias[ref],
+                url=AnyUrl(ref),
+                local_path=self.cache_path.joinpath(self._get_fig_name(ref)),
+            )
+            for ref in sorted(url_refs)
+        ]
 
         if missing:
-            raise ValueError(f"Missing figures: {missing}")
-
-        if to_download:
-            cache_url_figures(to_download)
-            self.cache = self.cache + FiguresCache(figures=to_download)
-            self.cache.write_json(self.cache_json_path)
-            for fig in to_download:
-                assert fig.local_path is not None, "Local path should be set"
-                shutil.copy(fig.local_path, build_dir / fig.new_alias)
+            raise ValueError(f"Missing figures: {sorted(missing)}")
+
+        # Cached figures are copied in the background while any new figures
+        # are downloaded (and copied as soon as each one arrives)
+        with concurrent.futures.ThreadPoolExecutor(
+            micromanubot.fetch.MAX_CONNECTIONS
+        ) as executor:
+            futures = {
+                executor.submit(shutil.copy, fig.local_path, build_dir / alias): fig
+                for alias, fig in to_copy.items()
+            }
+            if to_download:
+                cache_url_figures(to_download, build_dir=build_dir)
+                self.cache = FiguresCache.from_figures(self.cache.figures + to_download)
+                self.cache.write_json(self.cache_json_path)
+
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except OSError as e:
+                    fig = futures[future]
+                    raise ValueError(f"Failed to copy figure: {fig.old_alias}") from e
 
         return None
 
 
+@functools.lru_cache(maxsize=1024)
+def _is_url(key: str) -> bool:
+    """Check whether a figure key is a URL."""
+    return bool(validators.url(key))
+
+
 def extract_keys(fig_node: LatexEnvironmentNode) -> set[str]:
     """
     Extract the path/url from the figure node.
@@ -170,16 +207,18 @@ def extract_keys(fig_node: LatexEnvironmentNode) -> set[str]:
     \\end{figure} -> {myfig.png, myfig2.png}
     """
     results = set()
-    for node in fig_node.nodelist:
-        if (
-            isinstance(node, LatexEnvironmentNode)
-            and node.environmentname == "subfigure"
-        ):
-            keys = extract_keys(node)
-            results.update(keys)
-        if isinstance(node, LatexMacroNode) and node.macroname == "includegraphics":
-            key = extract_includegraphics_key(node)
-            results.add(key)
+    # Walk nested subfigures with an explicit stack instead of recursing
+    stack = [fig_node]
+    while stack:
+        for node in stack.pop().nodelist:
+            if type(node) is LatexMacroNode:
+                if node.macroname == "includegraphics":
+                    results.add(extract_includegraphics_key(node))
+            elif (
+                type(node) is LatexEnvironmentNode
+                and node.environmentname == "subfigure"
+            ):
+                stack.append(node)
 
     return results
 
@@ -207,31 +246,48 @@ def extract_includegraphics_key(node: LatexMacroNode) -> str:
     return key_node.chars
 
 
-def cache_url_figures(figures: list[FigureSpec], n_per_second: int = 50) -> None:
-    """Pull figures from a URL and save them to the cache."""
-    logger.info(f"Fetching {len(figures)} figure(s)")
-    rate = pyrate_limiter.Rate(n_per_second, pyrate_limiter.Duration.SECOND)
-    limiter = pyrate_limiter.Limiter(rate, max_delay=1000)
+def cache_url_figures(
+    figures: list[FigureSpec],
+    n_per_second: int = 50,
+    build_dir: pathlib.Path | None = None,
+) -> None:
+    """Pull figures from a URL and save them to the cache.
 
-    for fig in figures:
-        try:
-            limiter.try_acquire(str(fig.url))
-        except pyrate_limiter.LimiterDelayException as e:
-            raise ValueError("Rate limit exceeded") from e
-
-        assert fig.local_path is not None, "Local path should be set"
-        fetch_url_figure(str(fig.url), fig.local_path)
-
-
-def fetch_url_figure(url: str, cache_path: pathlib.Path) -> None:
+    See `micromanubot.fetch.fetch_concurrently` for how requests are made. If
+    `build_dir` is given, each figure is also copied there once it has been
+    fetched."""
+    logger.info(f"Fetching {len(figures)} figure(s)")
+    retries = requests.adapters.Retry(
+        total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]
+    )
+    fetch = functools.partial(_fetch_figure, build_dir=build_dir)
+    micromanubot.fetch.fetch_concurrently(figures, fetch, n_per_second, retries)
+
+
+def _fetch_figure(
+    fig: FigureSpec, session: requests.Session, build_dir: pathlib.Path | None
+) -> None:
+    """Fetch a figure into the cache, then optionally copy it to `build_dir`."""
+    assert fig.local_path is not None, "Local path should be set"
+    fetch_url_figure(str(fig.url), fig.local_path, session)
+    if build_dir is not None:
+        shutil.copy(fig.local_path, build_dir / fig.new_alias)
+
+
+def fetch_url_figure(
+    url: str, cache_path: pathlib.Path, session: requests.Session | None = None
+) -> None:
     """Fetch a figure from a URL and save it to the cache."""
     parsed = urllib.parse.urlparse(url)
     if parsed.netloc == "github.com":
         url = url + "?raw=true"
 
-    result = requests.get(url)
-    if result.status_code != 200:
-        raise ValueError(f"Failed to fetch figure: {url}")
+    get = requests.get if session is None else session.get
+    with get(url, stream=True, timeout=(5, 30)) as result:
+        if result.status_code != 200:
+            raise ValueError(f"Failed to fetch figure: {url}")
 
-    with open(cache_path, "wb") as f:
-        f.write(result.content)
+        # Stream the image to disk instead of holding it in memory
+        result.raw.decode_content = True
+        with open(cache_path, "wb") as f:
+            shutil.copyfileobj(result.raw, f)
@@ -3,25 +3,35 @@
 Defaults to TinyTeX. Installation requires the "tex" extra.
 """
 
+import functools
+import os
 import pathlib
 import shutil
 import subprocess
-
-import micromanubot.pytinytex
+import sys
 
 DEFAULT_PACKAGES = ["fancyhdr", "multirow", "preprint"]
 
 
+def _tinytex_dir() -> pathlib.Path:
+    """The default TinyTeX location, `~/.umb/tinytex`."""
+    return pathlib.Path.home().joinpath(".umb", "tinytex")
+
+
 def is_tinytex_installed() -> bool:
-    return pathlib.Path.home().joinpath(".umb", "tinytex").exists()
+    return _tinytex_dir().exists()
 
 
+@functools.lru_cache(maxsize=None)
 def _find_binary(name: str) -> pathlib.Path:
-    root = pathlib.Path.home().joinpath(".umb")
-    umb_dir = root.joinpath("tinytex", "bin")
-    matches = list(umb_dir.glob(f"*/{name}"))
-    if len(matches) > 0:
-        return matches[0]
+    """Find a TeX binary, preferring the TinyTeX installation.
+
+    Results are cached, so the cache must be cleared whenever TinyTeX is
+    installed or uninstalled (see `_clear_binary_cache`).
+    """
+    path = _list_tinytex_binaries().get(name)
+    if path is not None:
+        return pathlib.Path(path)
 
     on_path = shutil.which(name)
     if on_path:
@@ -30,6 +40,34 @@ def _find_binary(name: str) -> pathlib.Path:
     raise FileNotFoundError(f"{name} not found")
 
 
+@functools.lru_cache(maxsize=None)
+def _list_tinytex_binaries() -> dict[str, str]:
+    """Map the names of executables in TinyTeX to their paths.
+
+    TinyTeX puts binaries in a platform directory, e.g. `bin/x86_64-linux`.
+    Listing them once serves every binary lookup.
+    """
+    binaries: dict[str, str] = dict()
+    try:
+        with os.scandir(_tinytex_dir().joinpath("bin")) as entries:
+            platform_dirs = [entry.path for entry in entries if entry.is_dir()]
+    except OSError:
+        return binaries
+
+    for platform_dir in platform_dirs:
+        with os.scandir(platform_dir) as entries:
+            for entry in entries:
+                if entry.name not in binaries and os.access(entry.path, os.X_OK):
+                    binaries[entry.name] = entry.path
+
+    return binaries
+
+
+def _clear_binary_cache() -> None:
+    _find_binary.cache_clear()
+    _list_tinytex_binaries.cache_clear()
+
+
 def find_pdflatex() -> pathlib.Path:
     return _find_binary("pdflatex")
 
@@ -48,20 +86,50 @@ def check_pdflatex_bibtex_installed() -> None:
     find_bibtex()
 
 
-def install_tinytex(root: pathlib.Path) -> None:
+def install_tinytex(root: pathlib.Path, update_self: bool = False) -> None:
+    """Install TinyTeX and the default packages under `root`.
+
+    Each tlmgr call is slow to start, so tlmgr only updates itself if
+    `update_self` is set, or if the package install fails without it.
+    """
+    # Only needed here, so other commands don't pay for importing it
+    import micromanubot.pytinytex
+
     tex_dir = root.joinpath("tinytex")
     tex_dir.mkdir(parents=True, exist_ok=True)
-    tex_dir = tex_dir.as_posix()
+    tex_path = os.fspath(tex_dir)
     micromanubot.pytinytex.download_tinytex(
-        target_folder=tex_dir, download_folder=tex_dir
+        target_folder=tex_path, download_folder=tex_path
     )
+    _clear_binary_cache()
     check_pdflatex_bibtex_installed()
-    update_tlmgr()
-    install_packages(DEFAULT_PACKAGES)
+    if update_self:
+        update_tlmgr()
+        install_packages(DEFAULT_PACKAGES)
+        return
+
+    try:
+        install_packages(DEFAULT_PACKAGES)
+    except RuntimeError:
+        # The bundled tlmgr may be older than the package repository allows
+        update_tlmgr()
+        install_packages(DEFAULT_PACKAGES)
 
 
 def uninstall_tinytex(root: pathlib.Path) -> None:
-    shutil.rmtree(root.joinpath("tinytex"))
+    tex_dir = root.joinpath("tinytex")
+    rm = shutil.which("rm") if sys.platform != "win32" else None
+    if rm is None:
+        shutil.rmtree(tex_dir)
+    else:
+        # TinyTeX has thousands of files, which `rm` deletes faster than rmtree
+        # `--` stops a relative path starting with `-` being read as options
+        result = subprocess.run(
+            [rm, "-rf", "--", tex_dir.as_posix()], capture_output=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to remove TinyTeX: {result.stderr.decode()}")
+    _clear_binary_cache()
 
 
 def update_tlmgr() -> None:
@@ -75,11 +143,32 @@ def update_tlmgr() -> None:
 
 
 def install_packages(packages: list[str]) -> None:
+    """Install TeX packages with a single tlmgr call.
+
+    Packages that are already installed are skipped. Gather packages into one
+    list rather than calling this in a loop.
+    """
     tlmgr = find_tlmgr()
-    command = [tlmgr.as_posix(), "install"] + packages
+    installed = list_installed_packages()
+    missing = [package for package in packages if package not in installed]
+    if not missing:
+        return
+
+    command = [tlmgr.as_posix(), "install"] + missing
     result = subprocess.run(command, capture_output=True)
     if result.returncode != 0:
         raise RuntimeError(
             f"Failed to install packages: {result.stdout.decode()} "
             f"{result.stderr.decode()}"
         )
+
+
+def list_installed_packages() -> set[str]:
+    """List installed TeX packages, or an empty set if tlmgr can't say."""
+    tlmgr = find_tlmgr()
+    command = [tlmgr.as_posix(), "info", "--only-installed", "--data", "name"]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        return set()
+
+    return set(result.stdout.decode().split())
@@ -1,3 +1,6 @@
+from __future__ import annotations
+
+import concurrent.futures
 import importlib.resources
 import pathlib
 import shutil
@@ -35,14 +38,12 @@ def initialize(directory: pathlib.Path, no_custom: bool = True) -> None:
         raise OSError(f"{directory} is not writable") from e
 
     cache_dir = directory.joinpath(".umb")
-    cache_dir.mkdir()
-    cache_dir.joinpath("images").mkdir()
-    cache_dir.joinpath("citations_cache.bib").touch()
+    cache_dir.joinpath("images").mkdir(parents=True)
+    cache_dir.joinpath("citations_cache.bib").write_bytes(b"")
     fig_cache = cache_dir.joinpath("figures_cache.json")
     micromanubot.figures.FiguresCache(figures=[]).write_json(fig_cache)
 
-    with open(directory.joinpath(".gitignore"), "w") as f:
-        f.write(".umb\nbuild\n")
+    directory.joinpath(".gitignore").write_text(".umb\nbuild\n")
 
     _make_template_manuscript(directory)
 
@@ -55,7 +56,7 @@ def _check_directory(directory: pathlib.Path) -> None:
     if not directory.is_dir():
         raise NotADirectoryError(f"{directory} is not a directory")
 
-    if list(directory.iterdir()):
+    if next(directory.iterdir(), None) is not None:
         raise ValueError(f"{directory} is not empty")
 
 
@@ -63,9 +64,8 @@ def _make_template_manuscript(directory: pathlib.Path) -> None:
     """Create a template manuscript in the given directory."""
     content_templates = importlib.resources.files("micromanubot.template_data.content")
     content_dir = directory.joinpath("content")
-    content_dir.mkdir()
-    content_dir.joinpath("images").mkdir()
-    files = [
+    content_dir.joinpath("images").mkdir(parents=True)
+    content_files = [
         "abstract.tex",
         "1.introduction.tex",
         "2.results.tex",
@@ -75,22 +75,33 @@ def _make_template_manuscript(directory: pathlib.Path) -> None:
         "imports.tex",
         "manual_references.bib",
     ]
-    for file in files:
-        source_file = content_templates.joinpath(file)
-        with importlib.resources.as_file(source_file) as source_path:
-            shutil.copy(source_path, content_dir.joinpath(file))
 
     asset_templates = importlib.resources.files("micromanubot.template_data.assets")
     asset_dir = directory.joinpath("assets")
     asset_dir.mkdir()
-    files = [
+    asset_files = [
         "arxiv.sty",
         "orcid.pdf",
     ]
-    for file in files:
-        source_file = asset_templates.joinpath(file)
-        with importlib.resources.as_file(source_file) as source_path:
-            shutil.copy(source_path, asset_dir.joinpath(file))
+
+    # The copies are independent, so they are done concurrently
+    jobs = [(content_templates, file, content_dir) for file in content_files]
+    jobs += [(asset_templates, file, asset_dir) for file in asset_files]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(_copy_resource, *job) for job in jobs]
+        for future in futures:
+            future.result()
+
+
+def _copy_resource(
+    templates: importlib.resources.abc.Traversable,
+    filename: str,
+    dest_dir: pathlib.Path,
+) -> None:
+    """Copy a packaged template file into a directory."""
+    source_file = templates.joinpath(filename)
+    with importlib.resources.as_file(source_file) as source_path:
+        shutil.copy(source_path, dest_dir.joinpath(filename))
 
 
 def git_init(directory: pathlib.Path) -> None:
@@ -4,6 +4,11 @@ Slightly modified from https://github.com/JessicaTegner/PyTinyTeX.
 Not planning to refactor to match style with the rest of the project.
 """
 
+import concurrent.futures
+import functools
+import hashlib
+import http.client
+import json
 import logging
 import os
 import platform
@@ -11,12 +16,19 @@ import re
 import shutil
 import sys
 import tarfile
+import time
+import types
 import urllib.error
 import urllib.request
 import zipfile
 
 logger = logging.getLogger(__name__)
 
+# regex for the binaries
+_ASSET_RE = re.compile(
+    r"/rstudio/tinytex-releases/releases/download/.*TinyTeX\-.*.(?:tar\.gz|tgz|zip)"
+)
+
 
 def download_tinytex(
     version="latest", variation=1, target_folder=".", download_folder=None
@@ -28,7 +40,7 @@ def download_tinytex(
         if platform.architecture()[0] != "64bit":
             raise RuntimeError("Linux TinyTeX is only compiled for 64bit.")
     # get TinyTeX
-    tinytex_urls, _ = _get_tinytex_urls(version, variation)
+    tinytex_urls, version = _get_tinytex_urls(version, variation)
     if pf not in tinytex_urls:
         raise RuntimeError(
             "Can't handle your platform (only Linux, Mac OS X, Windows)."
@@ -40,21 +52,21 @@ def download_tinytex(
     if download_folder is None:
         download_folder = "."
     filename = os.path.join(os.path.expanduser(download_folder), filename)
-    if os.path.isfile(filename):
+    expected = _get_tinytex_digests(version).get(url)
+    if os.path.isfile(filename) and _verify_sha256(filename, expected):
         logger.info(f"Using already downloaded file {filename}")
     else:
         logger.info(f"Downloading TinyTeX from {url} ...")
-        response = urllib.request.urlopen(url)
-        with open(filename, "wb") as out_file:
-            shutil.copyfileobj(response, out_file)
+        _download(url, filename)
+        if not _verify_sha256(filename, expected):
+            os.remove(filename)
+            raise RuntimeError(f"Checksum mismatch for {url}")
         logger.info(f"Downloaded TinyTeX, saved in {filename} ...")
 
     logger.info(f"Extracting {filename} to {target_folder}...")
     extracted_dir_name = "TinyTeX"
     if filename.endswith(".zip"):
-        zf = zipfile.ZipFile(filename)
-        zf.extractall(target_folder)
-        zf.close()
+        _extract_zip(filename, target_folder)
     elif filename.endswith(".tgz"):
         tf = tarfile.open(filename, "r:gz")
         tf.extractall(target_folder)
@@ -67,11 +79,83 @@ def download_tinytex(
     else:
         raise RuntimeError(f"File {filename} not supported")
     tinytex_extracted = os.path.join(target_folder, extracted_dir_name)
-    for file_name in os.listdir(tinytex_extracted):
-        shutil.move(os.path.join(tinytex_extracted, file_name), target_folder)
-    shutil.rmtree(tinytex_extracted)
+    # the extracted folder is inside target_folder, so a rename of each
+    # top-level entry is enough (the archive itself is also in target_folder,
+    # so the folder can't be swapped as a whole)
+    with os.scandir(tinytex_extracted) as entries:
+        for entry in entries:
+            os.rename(entry.path, os.path.join(target_folder, entry.name))
+    os.rmdir(tinytex_extracted)
+
+
+def _download(url, filename, attempts=3):
+    # retry truncated or failed downloads with exponential backoff
+    for attempt in range(attempts):
+        try:
+            response = urllib.request.urlopen(url)
+            with open(filename, "wb") as out_file:
+                shutil.copyfileobj(response, out_file, length=1024 * 1024)
+            expected = int(response.headers.get("Content-Length", -1))
+            actual = os.path.getsize(filename)
+            if expected != -1 and expected != actual:
+                raise RuntimeError(
+                    f"Downloaded length {actual} != reported length {expected}"
+                )
+            return
+        except (OSError, http.client.HTTPException, RuntimeError):
+            if os.path.exists(filename):
+                os.remove(filename)
+            if attempt == attempts - 1:
+                raise
+            logger.info(f"Download failed, retrying ({attempt + 1}/{attempts})")
+            time.sleep(2**attempt)
 
 
+def _verify_sha256(filename, expected):
+    # files are accepted as-is when no digest is published
+    if expected is None:
+        return True
+    sha256 = hashlib.sha256()
+    with open(filename, "rb") as f:
+        while block := f.read(1024 * 1024):
+            sha256.update(block)
+    return sha256.hexdigest() == expected
+
+
+def _get_tinytex_digests(version):
+    # map asset urls to SHA-256 digests published by the GitHub release API
+    url = (
+        "https://api.github.com/repos/rstudio/tinytex-releases/releases/tags/" + version
+    )
+    try:
+        response = urllib.request.urlopen(url)
+        release = json.load(response)
+    except (OSError, ValueError):
+        logger.info("Could not fetch TinyTeX checksums, skipping verification")
+        return {}
+    digests = {}
+    for asset in release.get("assets", []):
+        digest = asset.get("digest") or ""
+        if digest.startswith("sha256:"):
+            digests[asset["browser_download_url"]] = digest[len("sha256:") :]
+    return digests
+
+
+def _extract_zip(filename, target_folder):
+    # zip members can be read independently, so extract them in parallel.
+    # tar.gz archives are a single compressed stream and stay serial.
+    with zipfile.ZipFile(filename) as zf:
+        members = zf.infolist()
+        # create directories first so workers don't race to create them
+        dirs = {os.path.dirname(m.filename) for m in members}
+        for d in sorted(dirs):
+            os.makedirs(os.path.join(target_folder, d), exist_ok=True)
+        files = [m for m in members if not m.is_dir()]
+        with concurrent.futures.ThreadPoolExecutor(os.cpu_count()) as executor:
+            list(executor.map(lambda m: zf.extract(m, target_folder), files))
+
+
+@functools.lru_cache(maxsize=8)
 def _get_tinytex_urls(version, variation):
     url = (
         "https://github.com/rstudio/tinytex-releases/releases/"
@@ -91,12 +175,8 @@ def _get_tinytex_urls(version, variation):
         + version
     )
     content = response.read()
-    # regex for the binaries
-    regex = re.compile(
-        r"/rstudio/tinytex-releases/releases/download/.*TinyTeX\-.*.(?:tar\.gz|tgz|zip)"
-    )
     # a list of urls to the binaries
-    tinytex_urls_list = regex.findall(content.decode("utf-8"))
+    tinytex_urls_list = _ASSET_RE.findall(content.decode("utf-8"))
     # dict that lookup the platform from binary extension
     ext2platform = {"zip": "win32", ".gz": "linux", "tgz": "darwin"}
     # parse tinytex from list to dict
@@ -112,4 +192,5 @@ def _get_tinytex_urls(version, variation):
         ext2platform[url_frag[-3:]]: ("https://github.com" + url_frag)
         for url_frag in tinytex_urls_list
     }
-    return tinytex_urls, version
+    # read-only, since the result is cached
+    return types.MappingProxyType(tinytex_urls), version
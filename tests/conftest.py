@@ -0,0 +1,51 @@
+import argparse
+import functools
+import os
+import pathlib
+
+import pytest
+from pylatexenc.latexwalker import LatexNode
+
+import micromanubot.build
+import micromanubot.cli
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    """Skip tests marked `network` unless `UMB_RUN_NETWORK_TESTS` is set."""
+    if os.environ.get("UMB_RUN_NETWORK_TESTS"):
+        return
+
+    skip = pytest.mark.skip(reason="set UMB_RUN_NETWORK_TESTS=1 to run")
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def scaffold(tmp_path_factory: pytest.TempPathFactory) -> pathlib.Path:
+    """A new manuscript project, created once per test session.
+
+    Tests must not modify it. Copy it first if a test needs to write.
+    """
+    root = tmp_path_factory.mktemp("scaffold").joinpath("my-manuscript")
+    new_args = argparse.Namespace(PATH=root, no_custom=True)
+    micromanubot.cli.handle_new(new_args)
+    return root
+
+
+@functools.lru_cache(maxsize=None)
+def parse_first_node(source: str) -> LatexNode:
+    """Parse a LaTeX snippet and return its first node.
+
+    Parsing goes through the build module, which shares one LaTeX context
+    database between walkers instead of building one per snippet.
+    """
+    return micromanubot.build.parse_latex_node(source)
+
+
+@pytest.fixture
+def node(request: pytest.FixtureRequest) -> LatexNode:
+    """The first node of a LaTeX snippet, for indirect parametrization."""
+    return parse_first_node(request.param)
@@ -1,21 +1,195 @@
 import importlib.resources
+import json
+
+import pytest
 
 import micromanubot.build
 import micromanubot.template_data.build
 
 
-def test_parse_templates():
+MAIN_TEMPLATES = ("@metadata", "@abstract", "@main", "@supplement")
+
+
+@pytest.mark.parametrize("template_name, expected", [("main.tex", MAIN_TEMPLATES)])
+def test_parse_templates(template_name, expected):
     template_files = importlib.resources.files("micromanubot.template_data.build")
-    template_path = template_files.joinpath("main.tex")
-    with importlib.resources.as_file(template_path) as file:
-        with open(file, "r") as f:
-            input_data = f.read()
+    input_data = template_files.joinpath(template_name).read_text(encoding="utf-8")
 
     templates = micromanubot.build.MainTemplate._parse_templates(input_data)
-    correct_templates = [
-        "@metadata",
-        "@abstract",
-        "@main",
-        "@supplement",
+    assert tuple(templates) == expected
+
+
+def test_find_references_cache(tmp_path):
+    content = (
+        "\\cite{abc123, @doi:10.1103/PhysRev.47.777}\n"
+        "\\begin{figure}\\includegraphics{myfig.png}\\end{figure}\n"
+    )
+    expected = ({"abc123", "@doi:10.1103/PhysRev.47.777"}, {"myfig.png"})
+
+    section = micromanubot.build.ManuscriptSection(content)
+    assert section.find_references(tmp_path) == expected
+    assert tmp_path.joinpath(f"{section.digest}.json").exists()
+
+    # A second section with identical content is served from the cache
+    cached_section = micromanubot.build.ManuscriptSection(content)
+    assert cached_section.digest == section.digest
+    assert cached_section.find_references(tmp_path) == expected
+
+
+@pytest.mark.parametrize(
+    "content, replacements, expected",
+    [
+        ("no keys here", {}, "no keys here"),
+        (r"\cite{@doi:1, abc}", {"@doi:1": "doi:1"}, r"\cite{doi:1, abc}"),
+        ("a.png a.png.bak", {"a.png": "x", "a.png.bak": "y"}, "x y"),
+        ("a b", {"a": "b", "b": "c"}, "b c"),
+    ],
+)
+def test_replace_all(content, replacements, expected):
+    assert micromanubot.build.replace_all(content, replacements) == expected
+
+
+def test_hash_latex_inputs(tmp_path):
+    tmp_path.joinpath("main.tex").write_text("\\input{1.intro.tex}")
+    tmp_path.joinpath("1.intro.tex").write_text("Hello")
+    digest = micromanubot.build.hash_latex_inputs(tmp_path)
+
+    # Compiler outputs do not change the hash
+    tmp_path.joinpath("main.aux").write_text("\\relax")
+    tmp_path.joinpath("main.pdf").write_bytes(b"%PDF")
+    tmp_path.joinpath("1.intro.aux").write_text("\\relax")
+    tmp_path.joinpath("umb-build.log").write_text("This is pdfTeX")
+    assert micromanubot.build.hash_latex_inputs(tmp_path) == digest
+
+    # Upgrading the LaTeX engine changes the hash
+    assert micromanubot.build.hash_latex_inputs(tmp_path, "pdfTeX 3.2") != digest
+
+    tmp_path.joinpath("1.intro.tex").write_text("Hello, world")
+    assert micromanubot.build.hash_latex_inputs(tmp_path) != digest
+
+
+@pytest.mark.parametrize(
+    "log, expected",
+    [
+        (None, True),
+        ("Output written on main.pdf (2 pages).", False),
+        ("Label(s) may have changed. Rerun to get cross-references right.", True),
+        ("Package longtable Warning: Table widths have changed. Rerun LaTeX.", True),
+    ],
+)
+def test_latex_needs_rerun(tmp_path, log, expected):
+    if log is not None:
+        tmp_path.joinpath("main.log").write_text(log)
+    assert micromanubot.build.latex_needs_rerun(tmp_path) == expected
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (r"\cite{abc123}", ({"abc123"}, set())),
+        (r"See \cite[p.~5]{abc123, def456}.", ({"abc123", "def456"}, set())),
+        (r"\textbf{\cite{abc123}}", ({"abc123"}, set())),
+        ("% \\cite{commented}\n\\cite{abc123}", ({"abc123"}, set())),
+        (r"100\% \cite{abc123}", ({"abc123"}, set())),
+        (r"\citep{other}", (set(), set())),
+        ("\\begin{verbatim}\\cite{x}\\end{verbatim}", (set(), set())),
+        (r"\verb|\cite{y}| and \cite{abc123}", ({"abc123"}, set())),
+        (r"\newcommand{\mycite}[1]{\cite{#1}}", (set(), set())),
+        (r"\def\mycite#1{{\cite{#1}}} \mycite{abc123}", (set(), set())),
+        (
+            "\\begin{figure}[H]\n"
+            "\\includegraphics[width=\\textwidth]{myfig.png}\n"
+            "\\caption{A figure \\cite{abc123}.}\n"
+            "\\end{figure}",
+            ({"abc123"}, {"myfig.png"}),
+        ),
+    ],
+)
+def test_find_references(content, expected):
+    section = micromanubot.build.ManuscriptSection(content)
+    assert section.find_references() == expected
+
+
+def test_find_section_references(tmp_path):
+    contents = [r"\cite{abc123}", r"\cite{def456}", "No references"]
+    sections = [micromanubot.build.ManuscriptSection(c) for c in contents]
+    micromanubot.build.find_section_references(sections, tmp_path)
+    expected = [({"abc123"}, set()), ({"def456"}, set()), (set(), set())]
+    assert [section.references for section in sections] == expected
+    assert len(list(tmp_path.iterdir())) == 3
+
+    # Editing a section replaces its cached references
+    sections[1] = micromanubot.build.ManuscriptSection(r"\cite{ghi789}")
+    micromanubot.build.find_section_references(sections, tmp_path)
+    micromanubot.build.prune_reference_cache(sections, tmp_path)
+    cached = sorted(path.stem for path in tmp_path.iterdir())
+    assert cached == sorted(section.digest for section in sections)
+
+
+def test_is_build_current(tmp_path):
+    for dirname in ("content", "assets", "build", ".umb"):
+        tmp_path.joinpath(dirname).mkdir()
+    tmp_path.joinpath("umb.toml").write_text("")
+    section = tmp_path.joinpath("content", "1.introduction.tex")
+    section.write_text("Hello")
+    assert not micromanubot.build.is_build_current(tmp_path)
+
+    build_dir = tmp_path.joinpath("build")
+    build_dir.joinpath("images").mkdir()
+    build_dir.joinpath("main.tex").write_text("")
+    build_dir.joinpath("images", "fig.jpg").write_bytes(b"")
+    manifest = micromanubot.build.build_manifest(tmp_path)
+    manifest["outputs"] = micromanubot.build.list_build_outputs(build_dir)
+    assert manifest["outputs"] == ["images/fig.jpg", "main.tex"]
+    with open(tmp_path.joinpath(".umb", "build_manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    assert micromanubot.build.is_build_current(tmp_path)
+
+    # Deleting a generated file makes the build stale
+    build_dir.joinpath("images", "fig.jpg").unlink()
+    assert not micromanubot.build.is_build_current(tmp_path)
+    build_dir.joinpath("images", "fig.jpg").write_bytes(b"")
+    assert micromanubot.build.is_build_current(tmp_path)
+
+    section.write_text("Hello, world")
+    assert not micromanubot.build.is_build_current(tmp_path)
+
+
+def test_clear_directory(tmp_path):
+    build_dir = tmp_path.joinpath("build")
+    build_dir.joinpath("images").mkdir(parents=True)
+    build_dir.joinpath("images", "fig.png").write_bytes(b"")
+    trash_dir = tmp_path.joinpath(".umb")
+    trash_dir.joinpath("trash-1-2", "images").mkdir(parents=True)
+    trash_dir.joinpath("ast_cache").mkdir()
+
+    micromanubot.build.clear_directory(build_dir, trash_dir).join()
+    assert not build_dir.exists()
+    # Trash from interrupted runs is removed too, but nothing else
+    assert [path.name for path in trash_dir.iterdir()] == ["ast_cache"]
+
+    # Back-to-back clears are both moved to the trash, not deleted in place
+    threads = list()
+    for _ in range(2):
+        build_dir.joinpath("images").mkdir(parents=True)
+        threads.append(micromanubot.build.clear_directory(build_dir, trash_dir))
+        assert not build_dir.exists()
+    for thread in threads:
+        thread.join()
+    assert [path.name for path in trash_dir.iterdir()] == ["ast_cache"]
+
+
+def test_find_manuscript_files(tmp_path):
+    content_dir = tmp_path.joinpath("content")
+    content_dir.mkdir()
+    names = ["supplement.tex", "2.results.tex", "abstract.tex", "1.intro.tex"]
+    for name in names + ["imports.tex", "notes.txt"]:
+        content_dir.joinpath(name).write_text("")
+
+    main_files = micromanubot.build.find_manuscript_files(tmp_path)
+    assert [path.name for path in main_files] == [
+        "abstract.tex",
+        "1.intro.tex",
+        "2.results.tex",
+        "supplement.tex",
     ]
-    assert templates == correct_templates
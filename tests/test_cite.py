@@ -1,11 +1,11 @@
-import pylatexenc.latexwalker
+import bibtexparser
 import pytest
 
 import micromanubot.cite
 
 
 @pytest.mark.parametrize(
-    "input, expected",
+    "node, expected",
     [
         (r"\cite{abc123}", {"abc123"}),
         (r"\cite{abc123,def456}", {"abc123", "def456"}),
@@ -17,14 +17,61 @@ import micromanubot.cite
             {"@doi:10.1103/PhysRev.47.777", "@doi:10.1002/andp.19053220607"},
         ),
     ],
+    indirect=["node"],
 )
-def test_extract_keys(input, expected):
-    parsed = pylatexenc.latexwalker.LatexWalker(input).get_latex_nodes()[0][0]
-    assert micromanubot.cite.extract_keys(parsed) == expected
+def test_extract_keys(node, expected):
+    assert micromanubot.cite.extract_keys(node) == expected
 
 
+@pytest.mark.network
 def test_fetch_doi_reference():
     doi = "10.1103/PhysRev.47.777"
     expected_output = "@article{Einstein_1935, title={Can Quantum-Mechanical Description of Physical Reality Be Considered Complete?}, volume={47}, ISSN={0031-899X}, url={http://dx.doi.org/10.1103/PhysRev.47.777}, DOI={10.1103/physrev.47.777}, number={10}, journal={Physical Review}, publisher={American Physical Society (APS)}, author={Einstein, A. and Podolsky, B. and Rosen, N.}, year={1935}, month=may, pages={777–780} }"
     reference = micromanubot.cite.fetch_doi_reference(doi)
     assert reference.strip() == expected_output
+
+
+def test_load_library(tmp_path):
+    bib_path = tmp_path.joinpath("refs.bib")
+    parsed_path = tmp_path.joinpath("refs.bib.json")
+    bib_path.write_text("@misc{abc123, title={First}}\n")
+
+    library = micromanubot.cite.load_library(bib_path, parsed_path)
+    assert parsed_path.exists()
+    assert list(library.entries_dict) == ["abc123"]
+
+    cached = micromanubot.cite.load_library(bib_path, parsed_path)
+    assert list(cached.entries_dict) == ["abc123"]
+    assert cached.entries[0].fields_dict["title"].value == "First"
+
+    # Changing the BibTeX file invalidates the cached copy
+    bib_path.write_text("@misc{def456, title={Second, and longer}}\n")
+    updated = micromanubot.cite.load_library(bib_path, parsed_path)
+    assert list(updated.entries_dict) == ["def456"]
+
+
+def test_reconcile_citations(tmp_path):
+    cache_path = tmp_path.joinpath("citations_cache.bib")
+    manual_path = tmp_path.joinpath("manual_references.bib")
+    cache_path.write_text("@misc{doi:10.1/abc, title={Cached}}\n")
+    manual_path.write_text("@misc{umb, title={Manual}}\n")
+
+    bib = micromanubot.cite.Bibliography(cache_path, manual_path)
+    bib.add_keys({"umb", "@doi:10.1/abc"})
+    library = bib.reconcile_citations()
+    assert [entry.key for entry in library.entries] == ["doi:10.1/abc", "umb"]
+
+    bib.add_keys({"not-a-reference"})
+    with pytest.raises(ValueError, match="not-a-reference"):
+        bib.reconcile_citations()
+
+
+def test_write_library(tmp_path):
+    path = tmp_path.joinpath("citations_cache.bib")
+    path.write_text("@misc{old, title={Old}}\n")
+    library = bibtexparser.parse_string("@misc{new, title={New}}\n")
+    micromanubot.cite.write_library(path, library)
+
+    written = bibtexparser.parse_file(str(path))
+    assert [entry.key for entry in written.entries] == ["new"]
+    assert list(tmp_path.iterdir()) == [path]
@@ -1,68 +1,146 @@
 import argparse
 import pathlib
-from tempfile import TemporaryDirectory
+import shutil
 
-import fitz
+import pytest
 
+import micromanubot.build
+import micromanubot.cite
 import micromanubot.cli
 import micromanubot.config
+import micromanubot.figures
+import micromanubot.install
 
+FAKE_LATEX = """#!/bin/sh
+echo "$0 $*" >> ../calls.log
+echo relax > main.aux
+echo "This is a fake LaTeX log" > main.log
+echo "%PDF-1.5" > main.pdf
+"""
 
-def test_new(tmp_path: pathlib.Path) -> None:
+
+def test_new(scaffold: pathlib.Path) -> None:
     """Test that all the necessary directories and files are created."""
-    with TemporaryDirectory() as tmp_dir:
-        tmp_path = pathlib.Path(tmp_dir).joinpath("my-manuscript")
-        new_args = argparse.Namespace(PATH=tmp_path, no_custom=True)
-        micromanubot.cli.handle_new(new_args)
-        directories = [
-            ".umb",
-            ".umb/images",
-            "assets",
-            "content",
-            "content/images",
-        ]
-        for directory in directories:
-            assert (tmp_path / directory).exists()
-            assert (tmp_path / directory).is_dir()
-
-        files = [
-            "umb.toml",
-            ".gitignore",
-            ".umb/citations_cache.bib",
-            ".umb/figures_cache.json",
-            "content/abstract.tex",
-            "content/1.introduction.tex",
-            "content/2.results.tex",
-            "content/3.discussion.tex",
-            "content/4.methods.tex",
-            "content/supplement.tex",
-            "content/imports.tex",
-            "content/manual_references.bib",
-        ]
-        for file in files:
-            assert (tmp_path / file).exists()
-            assert (tmp_path / file).is_file()
-
-
-def test_build(tmp_path: pathlib.Path) -> None:
+    directories = [
+        ".umb",
+        ".umb/images",
+        "assets",
+        "content",
+        "content/images",
+    ]
+    for directory in directories:
+        assert (scaffold / directory).exists()
+        assert (scaffold / directory).is_dir()
+
+    files = [
+        "umb.toml",
+        ".gitignore",
+        ".umb/citations_cache.bib",
+        ".umb/figures_cache.json",
+        "content/abstract.tex",
+        "content/1.introduction.tex",
+        "content/2.results.tex",
+        "content/3.discussion.tex",
+        "content/4.methods.tex",
+        "content/supplement.tex",
+        "content/imports.tex",
+        "content/manual_references.bib",
+    ]
+    for file in files:
+        assert (scaffold / file).exists()
+        assert (scaffold / file).is_file()
+
+
+@pytest.mark.network
+def test_build(scaffold: pathlib.Path, tmp_path: pathlib.Path) -> None:
     """Test that the build command works."""
-    with TemporaryDirectory() as tmp_dir:
-        tmp_path = pathlib.Path(tmp_dir).joinpath("my-manuscript")
-        new_args = argparse.Namespace(PATH=tmp_path, no_custom=True)
-        micromanubot.cli.handle_new(new_args)
+    project_path = tmp_path.joinpath("my-manuscript")
+    shutil.copytree(scaffold, project_path)
+
+    build_args = argparse.Namespace(type="all")
+    micromanubot.cli.handle_build(build_args, project_path)
+
+    build_files = [
+        "build/main.tex",
+        "build/main.pdf",
+    ]
+    for file in build_files:
+        assert (project_path / file).exists()
+        assert (project_path / file).is_file()
+
+    validate_pdf(project_path / "build/main.pdf")
+
+
+def test_build_offline(
+    scaffold: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    """Test repeated builds, with references, figures and LaTeX all faked."""
+    project_path = tmp_path.joinpath("my-manuscript")
+    shutil.copytree(scaffold, project_path)
+    monkeypatch.chdir(project_path)
 
-        build_args = argparse.Namespace(type="all")
-        micromanubot.cli.handle_build(build_args, tmp_path)
+    fetched = list()
 
-        build_files = [
-            "build/main.tex",
-            "build/main.pdf",
-        ]
-        for file in build_files:
-            assert (tmp_path / file).exists()
-            assert (tmp_path / file).is_file()
+    def fetch_doi_reference(key, *args, **kwargs):
+        fetched.append(key)
+        return "@article{Einstein_1935, title={EPR}, year={1935}}"
 
-        validate_pdf(tmp_path / "build/main.pdf")
+    def fetch_url_figure(url, cache_path, *args, **kwargs):
+        fetched.append(url)
+        pathlib.Path(cache_path).write_bytes(b"fake image")
+
+    monkeypatch.setattr(micromanubot.cite, "fetch_doi_reference", fetch_doi_reference)
+    monkeypatch.setattr(micromanubot.figures, "fetch_url_figure", fetch_url_figure)
+
+    tex_args = argparse.Namespace(type="tex")
+    micromanubot.cli.handle_build(tex_args, project_path)
+    build_dir = project_path.joinpath("build")
+    main_files = micromanubot.build.find_manuscript_files(project_path)
+    for file in main_files:
+        assert build_dir.joinpath(file.name).is_file()
+    assert build_dir.joinpath("main.tex").is_file()
+    references = build_dir.joinpath("references.bib").read_text()
+    assert "@article{doi:10.1103/PhysRev.47.777," in references
+    images = sorted(build_dir.joinpath("images").iterdir())
+    assert images
+    assert fetched
+
+    # Each section's references are cached
+    ast_cache = project_path.joinpath(".umb", "ast_cache")
+    assert len(list(ast_cache.iterdir())) == len(main_files)
+
+    # Unchanged sources are not rebuilt
+    n_fetched = len(fetched)
+    capsys.readouterr()
+    micromanubot.cli.handle_build(tex_args, project_path)
+    assert "Fresh" in capsys.readouterr().out
+
+    # Deleting a generated file triggers a rebuild, served from the caches
+    images[0].unlink()
+    micromanubot.cli.handle_build(tex_args, project_path)
+    assert "Fresh" not in capsys.readouterr().out
+    assert images[0].is_file()
+    assert len(fetched) == n_fetched
+
+    for name in ("pdflatex", "bibtex"):
+        fake_path = tmp_path.joinpath(name)
+        fake_path.write_text(FAKE_LATEX)
+        fake_path.chmod(0o755)
+        monkeypatch.setattr(micromanubot.install, f"find_{name}", lambda p=fake_path: p)
+
+    # The second PDF build is restored from the cache without compiling
+    pdf_args = argparse.Namespace(type="pdf")
+    calls_path = project_path.joinpath("calls.log")
+    micromanubot.cli.handle_build(pdf_args, project_path)
+    n_calls = len(calls_path.read_text().splitlines())
+    assert n_calls >= 3
+    build_dir.joinpath("main.pdf").unlink()
+    micromanubot.cli.handle_build(pdf_args, project_path)
+    assert build_dir.joinpath("main.pdf").is_file()
+    assert len(calls_path.read_text().splitlines()) == n_calls
 
 
 def validate_pdf(pdf_path: pathlib.Path) -> None:
@@ -72,6 +150,9 @@ def validate_pdf(pdf_path: pathlib.Path) -> None:
     early builds was failing to include images correctly. Could add many more
     checks here in the future.
     """
+    # PyMuPDF is slow to import, so only load it when a PDF is checked
+    import fitz
+
     doc = fitz.open(pdf_path)
     assert doc.page_count == 2
     pages = list(doc.pages())
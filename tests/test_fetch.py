@@ -0,0 +1,15 @@
+import requests
+
+import micromanubot.fetch
+
+
+def test_fetch_concurrently() -> None:
+    sessions = set()
+
+    def fetch(item: int, session: requests.Session) -> int:
+        sessions.add(session)
+        return item * 2
+
+    results = micromanubot.fetch.fetch_concurrently(list(range(20)), fetch)
+    assert results == [item * 2 for item in range(20)]
+    assert len(sessions) == 1
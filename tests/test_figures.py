@@ -1,11 +1,10 @@
 import pytest
-from pylatexenc.latexwalker import LatexWalker
 
 import micromanubot.figures
 
 
 @pytest.mark.parametrize(
-    "test_input,expected",
+    "node, expected",
     [
         (
             r"\begin{figure}\includegraphics[width=\textwidth]{myfig.png}\end{figure}",
@@ -20,16 +19,14 @@ import micromanubot.figures
             {"myfig.png", "myfig2.png"},
         ),
     ],
+    indirect=["node"],
 )
-def test_extract_keys(test_input, expected):
-    walker = LatexWalker(test_input)
-    nodelist, _, _ = walker.get_latex_nodes()
-    fig_node = nodelist[0]
-    assert micromanubot.figures.extract_keys(fig_node) == expected
+def test_extract_keys(node, expected):
+    assert micromanubot.figures.extract_keys(node) == expected
 
 
 @pytest.mark.parametrize(
-    "test_input,expected",
+    "node, expected",
     [
         (
             r"\includegraphics[width=\textwidth]{myfig.png}",
@@ -40,9 +37,28 @@ def test_extract_keys(test_input, expected):
             "myfig.png",
         ),
     ],
+    indirect=["node"],
 )
-def test_extract_includegraphics_key(test_input, expected):
-    walker = LatexWalker(test_input)
-    nodelist, _, _ = walker.get_latex_nodes()
-    fig_node = nodelist[0]
-    assert micromanubot.figures.extract_includegraphics_key(fig_node) == expected
+def test_extract_includegraphics_key(node, expected):
+    assert micromanubot.figures.extract_includegraphics_key(node) == expected
+
+
+def test_reconcile_figures(tmp_path, monkeypatch):
+    cache_dir = tmp_path.joinpath(".umb")
+    cache_dir.mkdir()
+    cache_dir.joinpath("figures_cache.json").write_text('{"figures": []}')
+    images_dir = tmp_path.joinpath("content", "images")
+    images_dir.mkdir(parents=True)
+    images_dir.joinpath("local.png").write_bytes(b"png")
+    build_dir = tmp_path.joinpath("build")
+    build_dir.joinpath("images").mkdir(parents=True)
+
+    monkeypatch.chdir(images_dir)
+    figures = micromanubot.figures.ManuscriptFigures(cache_dir, images_dir)
+    figures.add_references({"local.png"})
+    figures.reconcile_figures(build_dir)
+    assert build_dir.joinpath("images", "local.png").read_bytes() == b"png"
+
+    figures.reference_to_alias["not-a-figure"] = "images/not-a-figure"
+    with pytest.raises(ValueError, match="not-a-figure"):
+        figures.reconcile_figures(build_dir)
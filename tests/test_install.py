@@ -0,0 +1,36 @@
+import pathlib
+
+import pytest
+
+import micromanubot.install
+
+
+def test_find_binary(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    platform_dir = tmp_path.joinpath(".umb", "tinytex", "bin", "x86_64-linux")
+    platform_dir.mkdir(parents=True)
+    platform_dir.joinpath("pdflatex").touch(mode=0o755)
+    platform_dir.joinpath("README").touch(mode=0o644)
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("PATH", "")
+    micromanubot.install._clear_binary_cache()
+    try:
+        pdflatex = micromanubot.install.find_pdflatex()
+        assert pdflatex == platform_dir.joinpath("pdflatex")
+        with pytest.raises(FileNotFoundError):
+            micromanubot.install._find_binary("README")
+    finally:
+        micromanubot.install._clear_binary_cache()
+
+
+def test_uninstall_tinytex(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A relative root that looks like a command-line option
+    monkeypatch.chdir(tmp_path)
+    root = pathlib.Path("-root")
+    root.joinpath("tinytex", "bin").mkdir(parents=True)
+
+    micromanubot.install.uninstall_tinytex(root)
+    assert not root.joinpath("tinytex").exists()
+    assert root.exists()